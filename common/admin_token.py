@@ -0,0 +1,29 @@
+import os
+import stat
+
+# Variable de entorno con la clave de administracion
+# No se pasa por linea de comandos porque cualquier usuario la podria ver con "ps"
+ADMIN_TOKEN_ENV = "CHAT_ADMIN_TOKEN"
+
+# Lee la clave de administracion desde un archivo
+# El archivo solo puede ser legible por su dueño (permisos 600), si no se rechaza
+# Parametros:
+#   path: La ruta del archivo con la clave
+# Retorna:
+#   La clave sin espacios ni saltos de linea
+def read_token_file(path):
+    mode = os.stat(path).st_mode
+    if os.name == 'posix' and mode & (stat.S_IRWXG | stat.S_IRWXO):
+        raise PermissionError(f"{path} lo pueden leer otros usuarios, usa: chmod 600 {path}")
+    with open(path) as f:
+        return f.read().strip()
+
+# Obtiene la clave de administracion del archivo indicado o de la variable de entorno
+# Parametros:
+#   path: La ruta del archivo con la clave (opcional)
+# Retorna:
+#   La clave, o None si no hay ninguna configurada
+def load_admin_token(path=None):
+    if path:
+        return read_token_file(path) or None
+    return os.environ.get(ADMIN_TOKEN_ENV) or None
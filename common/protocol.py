@@ -7,16 +7,24 @@ class Protocol:
     PRIVATE_MSG = "PRIVATE_MSG"
     ERROR = "ERROR"
     ACK = "ACK"
+    FILE_OFFER = "FILE_OFFER"
+    FILE_CHUNK = "FILE_CHUNK"
+    FILE_GET = "FILE_GET"
+    ADMIN = "ADMIN"
+
+    # Tamaño de cada fragmento de archivo (los bytes viajan fuera del JSON)
+    CHUNK_SIZE = 64 * 1024
     #Cmpaqueta un mensaje en formato JSON y lo convierte a byes para enviarlo
     #Parametros:
     #   msg_type: Tipo de mensaje
     #   sender: nombre del usuario que envia el mensaje
     #   payload: el contenido del texto
     #   target: el destinatario del mensaje en caso de que sea paea usuarios privados
+    #   token: clave de sesion para las transferencias de archivos (solo se agrega si se indica)
     #Retorna: 
     #   Mensaje convertido en bytes codificado en utf-8
     @staticmethod
-    def create_message(msg_type, sender, payload="", target=None, sender_protocol=""):
+    def create_message(msg_type, sender, payload="", target=None, sender_protocol="", token=None):
         msg = {
             "type": msg_type,
             "sender": sender,
@@ -24,6 +32,8 @@ class Protocol:
             "target": target,
             "sender_protocol": sender_protocol
         }
+        if token:
+            msg["token"] = token
         return json.dumps(msg).encode('utf-8')
     #Convierte los bytes recibidos de vuelta a un diccionario de python
     #Parametros:
@@ -83,6 +83,32 @@ class TCPTransport(Transport):
             data += packet
         return data
 
+    #Envia una parte de un archivo directo desde el disco sin pasar por JSON
+    #Usa sock.sendfile, que por debajo usa os.sendfile (zero-copy) cuando el sistema lo soporta
+    #Parametros:
+    #   f: archivo abierto en modo binario
+    #   offset: posicion desde donde empezar a leer
+    #   count: cantidad de bytes a enviar
+    def send_file(self, f, offset, count):
+        if count > 0:
+            self.sock.sendfile(f, offset, count)
+
+    #Recibe exactamente "count" bytes crudos y los escribe en un archivo por partes
+    #Parametros:
+    #   f: archivo abierto en modo binario para escritura
+    #   count: cantidad de bytes que se esperan
+    #Retorna:
+    #   True si se recibieron todos los bytes, False si la conexion se cerro antes
+    def recv_to_file(self, f, count):
+        remaining = count
+        while remaining > 0:
+            packet = self.sock.recv(min(remaining, 65536))
+            if not packet:
+                return False
+            f.write(packet)
+            remaining -= len(packet)
+        return True
+
     def close(self):
         self.sock.close()
 
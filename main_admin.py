@@ -0,0 +1,70 @@
+import sys
+import argparse
+import getpass
+from common.protocol import Protocol
+from common.transport import TCPTransport
+from common.admin_token import ADMIN_TOKEN_ENV, load_admin_token
+
+# Envia un comando de administracion al servidor y espera la respuesta
+# Parametros:
+#   host: La IP del servidor (tiene que ser la misma computadora)
+#   port: El puerto TCP del servidor
+#   token: La clave de administracion
+#   command: 'stacks', 'cpu', 'start', 'stop' o 'profile'
+#   seconds: Cuantos segundos perfilar (solo para 'profile')
+# Retorna:
+#   El diccionario de la respuesta, o None si el servidor cerro la conexion
+def send_admin_command(host, port, token, command, seconds=None):
+    transport = TCPTransport()
+    try:
+        transport.connect(host, port)
+        payload = {"token": token, "command": command, "seconds": seconds}
+        transport.send(Protocol.create_message(Protocol.ADMIN, "ADMIN", payload))
+        data, _ = transport.recv()
+        return Protocol.parse_message(data) if data else None
+    finally:
+        transport.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Administracion del servidor de Chat TCP/UDP')
+    parser.add_argument('command', choices=['stacks', 'cpu', 'start', 'stop', 'profile'], help='Comando a ejecutar')
+    parser.add_argument('--token-file', default=None,
+                        help=f'Archivo (permisos 600) con la clave de administracion; si no se indica se usa la variable {ADMIN_TOKEN_ENV} o se pregunta')
+    parser.add_argument('--host', default='127.0.0.1', help='Direccion del servidor')
+    parser.add_argument('--port', type=int, default=8888, help='Puerto del servidor')
+    parser.add_argument('--seconds', type=int, default=10, help='Segundos a perfilar (comando profile)')
+    parser.add_argument('--output', default='profile.collapsed', help='Archivo donde guardar las pilas (comandos stop y profile)')
+    args = parser.parse_args()
+
+    try:
+        token = load_admin_token(args.token_file)
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not token:
+        token = getpass.getpass("Clave de administracion: ")
+
+    try:
+        reply = send_admin_command(args.host, args.port, token, args.command, args.seconds)
+    except ConnectionRefusedError:
+        print("No se pudo conectar al servidor")
+        sys.exit(1)
+
+    if not reply:
+        print("El servidor cerro la conexion")
+        sys.exit(1)
+    if reply.get('type') == Protocol.ERROR:
+        print(f"Error: {reply.get('payload')}")
+        sys.exit(1)
+
+    result = reply.get('payload')
+    if args.command in ['stop', 'profile']:
+        # Formato "collapsed", se puede abrir con flamegraph.pl o speedscope
+        with open(args.output, 'w') as f:
+            f.write(result)
+        print(f"Pilas guardadas en {args.output}")
+    elif args.command == 'cpu':
+        for name, seconds in sorted(result.items(), key=lambda item: -item[1]):
+            print(f"{seconds:10.4f} s  {name}")
+    else:
+        print(result)
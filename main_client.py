@@ -1,3 +1,4 @@
+import os
 import sys
 import threading
 import argparse
@@ -5,6 +6,9 @@ from datetime import datetime
 from common.protocol import Protocol
 from common.transport import TCPTransport, UDPTransport
 
+# Carpeta donde se guardan los archivos descargados
+DOWNLOAD_DIR = 'descargas'
+
 # Colores ANSI
 class Colors:
     RESET = '\033[0m'
@@ -31,6 +35,10 @@ class ChatClient:
         self.port = port
         self.protocol_type = protocol_type
         self.running = True
+        # Subidas sin terminar (ruta -> file_id) para poder continuarlas
+        self.uploads = {}
+        # Clave de sesion que da el servidor al iniciar sesion, se usa en las transferencias
+        self.session_token = None
         
         if self.protocol_type == 'tcp':
             self.transport = TCPTransport()
@@ -77,6 +85,8 @@ class ChatClient:
                 
                 msg = Protocol.parse_message(data)
                 if msg:
+                    if msg.get('type') == Protocol.ACK and msg.get('token'):
+                        self.session_token = msg['token']
                     self.display_message(msg)
             except Exception as e:
                 print(f"\nError: {e}")
@@ -108,6 +118,111 @@ class ChatClient:
         elif msg_type == Protocol.ACK:
             print(f"\n{Colors.GREEN}{payload}{Colors.RESET}")
 
+        elif msg_type == Protocol.FILE_OFFER:
+            print(f"\n{Colors.GRAY}[{timestamp}]{Colors.RESET} {Colors.BLUE}{Colors.BOLD}[Archivo de {sender}]{Colors.RESET} {Colors.BLUE}{payload['name']} ({payload['size']} bytes) - usa /get {payload['file_id']}{Colors.RESET}")
+
+    # Abre una conexion TCP aparte para transferir archivos
+    # Asi los archivos grandes no retrasan los mensajes del chat
+    # Retorna:
+    #   El transporte TCP conectado al servidor
+    def open_transfer(self):
+        transfer = TCPTransport()
+        transfer.connect(self.host, self.port)
+        return transfer
+
+    # Lee la respuesta del servidor en la conexion de transferencia
+    # Parametros:
+    #   transfer: El transporte de la transferencia
+    # Retorna:
+    #   El diccionario del mensaje, o None si se cerro la conexion
+    def recv_reply(self, transfer):
+        data, _ = transfer.recv()
+        if not data:
+            return None
+        return Protocol.parse_message(data)
+
+    # Sube un archivo al servidor por fragmentos
+    # Si una subida anterior del mismo archivo se corto, continua desde donde se quedo
+    # Parametros:
+    #   target: El usuario destino, o None para todos
+    #   path: La ruta del archivo a enviar
+    def upload_file(self, target, path):
+        transfer = None
+        try:
+            size = os.path.getsize(path)
+            offer = {"name": os.path.basename(path), "size": size, "file_id": self.uploads.get(path)}
+            transfer = self.open_transfer()
+            transfer.send(Protocol.create_message(Protocol.FILE_OFFER, self.username, offer, target=target, token=self.session_token))
+            reply = self.recv_reply(transfer)
+            if not reply or reply.get('type') != Protocol.FILE_OFFER:
+                if reply:
+                    self.display_message(reply)
+                return
+
+            file_id = reply['payload']['file_id']
+            offset = reply['payload']['offset']
+            self.uploads[path] = file_id
+            if offset == size:
+                print(f"\n{Colors.GREEN}Archivo {offer['name']} enviado (id {file_id}){Colors.RESET}")
+                del self.uploads[path]
+                return
+
+            with open(path, 'rb') as f:
+                while offset < size:
+                    length = min(Protocol.CHUNK_SIZE, size - offset)
+                    header = {"file_id": file_id, "offset": offset, "length": length}
+                    transfer.send(Protocol.create_message(Protocol.FILE_CHUNK, self.username, header, token=self.session_token))
+                    transfer.send_file(f, offset, length)
+                    offset += length
+
+            reply = self.recv_reply(transfer)
+            if reply:
+                self.display_message(reply)
+                if reply.get('type') == Protocol.ACK:
+                    del self.uploads[path]
+        except Exception as e:
+            print(f"\n{Colors.RED}Error al enviar archivo: {e}{Colors.RESET}")
+        finally:
+            if transfer:
+                transfer.close()
+
+    # Descarga un archivo del servidor a la carpeta de descargas
+    # Si existe una descarga parcial del mismo archivo, continua desde ahi
+    # Parametros:
+    #   file_id: El id del archivo a descargar
+    def download_file(self, file_id):
+        transfer = None
+        try:
+            os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+            part_path = os.path.join(DOWNLOAD_DIR, f"{file_id}.part")
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+            transfer = self.open_transfer()
+            transfer.send(Protocol.create_message(Protocol.FILE_GET, self.username, {"file_id": file_id, "offset": offset}, token=self.session_token))
+            reply = self.recv_reply(transfer)
+            if not reply or reply.get('type') != Protocol.FILE_CHUNK:
+                if reply:
+                    self.display_message(reply)
+                return
+
+            info = reply['payload']
+            with open(part_path, 'r+b' if os.path.exists(part_path) else 'wb') as f:
+                f.seek(info['offset'])
+                f.truncate()
+                complete = transfer.recv_to_file(f, info['length'])
+
+            if not complete:
+                print(f"\n{Colors.RED}Descarga incompleta, usa /get {file_id} para continuar{Colors.RESET}")
+                return
+            final_path = os.path.join(DOWNLOAD_DIR, os.path.basename(info['name']))
+            os.replace(part_path, final_path)
+            print(f"\n{Colors.GREEN}Archivo guardado en {final_path}{Colors.RESET}")
+        except Exception as e:
+            print(f"\n{Colors.RED}Error al descargar archivo: {e}{Colors.RESET}")
+        finally:
+            if transfer:
+                transfer.close()
+
     # Bucle principal para leer lo que escribe el usuario
     # Lee del teclado y lo envia al servidor
     def input_loop(self):
@@ -127,8 +242,25 @@ class ChatClient:
                 if text.lower() in ['/help']:
                     print(f"\n{Colors.BOLD}Comandos:{Colors.RESET}")
                     print(f"  {Colors.CYAN}/msg <usuario> <mensaje>{Colors.RESET} - Mensaje privado")
+                    print(f"  {Colors.CYAN}/file <usuario|*> <ruta>{Colors.RESET} - Enviar archivo (* para todos)")
+                    print(f"  {Colors.CYAN}/get <id>{Colors.RESET} - Descargar archivo")
                     print(f"  {Colors.CYAN}/quit{Colors.RESET} - Salir")
                     continue
+
+                if text.startswith('/file '):
+                    parts = text.split(' ', 2)
+                    if len(parts) < 3:
+                        print(f"{Colors.RED}Uso: /file <usuario|*> <ruta>{Colors.RESET}")
+                        continue
+                    target = None if parts[1] == '*' else parts[1]
+                    # La transferencia corre en otro hilo para poder seguir chateando
+                    threading.Thread(target=self.upload_file, args=(target, parts[2]), daemon=True).start()
+                    continue
+
+                if text.startswith('/get '):
+                    file_id = text.split(' ', 1)[1].strip()
+                    threading.Thread(target=self.download_file, args=(file_id,), daemon=True).start()
+                    continue
                 
                 if text.startswith('/msg '):
                     parts = text.split(' ', 2)
@@ -1,11 +1,17 @@
+import os
 import sys
+import time
+import hmac
 import threading
 import argparse
 import socket
 from datetime import datetime
 from common.protocol import Protocol
 from common.transport import TCPTransport, UDPTransport
+from common.admin_token import ADMIN_TOKEN_ENV, load_admin_token
 from server.client_manager import ClientManager
+from server.file_manager import FileManager, SpoolError
+from server.profiler import Profiler
 
 # Colores ANSI
 class Colors:
@@ -38,11 +44,20 @@ class ChatServer:
     #   host: La IP donde escuchar (0.0.0.0 significa todas)
     #   port: El puerto donde escuchar (ej: 8888)
     #   protocol_type: 'tcp', 'udp' o 'both'
-    def __init__(self, host='0.0.0.0', port=8888, protocol_type='tcp'):
+    #   spool_dir: La carpeta donde se guardan los archivos compartidos
+    #   max_file_size: El tamaño maximo de cada archivo en bytes
+    #   max_spool_size: El espacio maximo de todos los archivos juntos en bytes
+    #   max_user_spool: El espacio maximo de los archivos de cada usuario en bytes
+    #   admin_token: Clave para los comandos de administracion (None los desactiva)
+    def __init__(self, host='0.0.0.0', port=8888, protocol_type='tcp', spool_dir='spool', max_file_size=100 * 1024 * 1024,
+                 max_spool_size=1024 * 1024 * 1024, max_user_spool=300 * 1024 * 1024, admin_token=None):
         self.host = host
         self.port = port
         self.protocol_type = protocol_type
         self.client_manager = ClientManager()
+        self.file_manager = FileManager(spool_dir, max_file_size, max_spool_size, max_user_spool)
+        self.admin_token = admin_token
+        self.profiler = Profiler()
         self.running = True
         
         self.tcp_transport = None
@@ -78,13 +93,13 @@ class ChatServer:
         
         if self.protocol_type in ['tcp', 'both']:
             # El primer Hilo se encarga nomas de escuchar conexiones TCP
-            t = threading.Thread(target=self.accept_loop)
+            t = threading.Thread(target=self.accept_loop, name="accept_loop")
             t.start()
             threads.append(t)
             
         if self.protocol_type in ['udp', 'both']:
            # El segundo Hilo se encarga nomas de escuchar conexiones UDP
-            t = threading.Thread(target=self.udp_loop)
+            t = threading.Thread(target=self.udp_loop, name="udp_loop")
             t.start()
             threads.append(t)
             
@@ -110,7 +125,8 @@ class ChatServer:
 
                 threading.Thread(
                     target=self.handle_tcp_client,
-                    args=(client_transport,)
+                    args=(client_transport,),
+                    name=f"handle_tcp_client-{addr[0]}:{addr[1]}"
                 ).start()
 
             except Exception as e:
@@ -188,15 +204,31 @@ class ChatServer:
         sender = msg.get('sender')
         sender_protocol = "TCP" if isinstance(transport,TCPTransport) else "UDP"
 
+        if msg_type == Protocol.ADMIN:
+            return self.process_admin(msg, addr, transport)
+
         if msg_type == Protocol.LOGIN:
             if self.client_manager.add_client(sender, addr, transport):
                 print(f"{Colors.GREEN}{sender} se conecto desde {addr[0]}:{addr[1]}{Colors.RESET}")
                 self.broadcast_system(f"{sender} entro al chat")
-                return Protocol.create_message(Protocol.ACK, "SERVER", "Bienvenido al servidor")
+                token = self.client_manager.create_session(sender)
+                return Protocol.create_message(Protocol.ACK, "SERVER", "Bienvenido al servidor", token=token)
             else:
                 print(f"{Colors.RED}Login fallido: {sender}{Colors.RESET}")
                 return Protocol.create_message(Protocol.ERROR, "SERVER", "Usuario ocupado o servidor lleno")
 
+        if msg_type in [Protocol.FILE_OFFER, Protocol.FILE_CHUNK, Protocol.FILE_GET]:
+            # Los archivos van por su propia conexion TCP para no frenar los mensajes del chat
+            if not isinstance(transport, TCPTransport):
+                return Protocol.create_message(Protocol.ERROR, "SERVER", "Los archivos solo se pueden enviar por TCP")
+            # La conexion de archivos no inicia sesion, el usuario sale de la clave que se entrego en el login
+            user = self.client_manager.get_session_user(msg.get('token'))
+            if not user:
+                if msg_type == Protocol.FILE_CHUNK:
+                    self.abort_file_chunk(transport, "No has iniciado sesion")
+                return Protocol.create_message(Protocol.ERROR, "SERVER", "No has iniciado sesion")
+            return self.process_file_message(msg, user, transport)
+
         if not self.client_manager.is_member(sender):
             return Protocol.create_message(Protocol.ERROR, "SERVER", "No has iniciado sesion")
 
@@ -217,6 +249,164 @@ class ChatServer:
 
         return None
 
+    # Procesa los mensajes de transferencia de archivos (oferta, fragmento y descarga)
+    # Parametros:
+    #   msg: El diccionario del mensaje
+    #   sender: El usuario dueño de la clave de sesion del mensaje
+    #   transport: La conexion TCP dedicada a la transferencia
+    # Retorna:
+    #   Una respuesta si es necesario, o None
+    def process_file_message(self, msg, sender, transport):
+        msg_type = msg.get('type')
+        info = msg.get('payload')
+        if not isinstance(info, dict):
+            if msg_type == Protocol.FILE_CHUNK:
+                self.abort_file_chunk(transport, "Datos de archivo invalidos")
+            return Protocol.create_message(Protocol.ERROR, "SERVER", "Datos de archivo invalidos")
+
+        if msg_type == Protocol.FILE_OFFER:
+            target = msg.get('target')
+            name = os.path.basename(str(info.get('name', '')))
+            size = info.get('size')
+            if not name or type(size) is not int or size < 0:
+                return Protocol.create_message(Protocol.ERROR, "SERVER", "Datos de archivo invalidos")
+            if target and not self.client_manager.is_member(target):
+                return Protocol.create_message(Protocol.ERROR, "SERVER", f"Usuario {target} no encontrado")
+
+            if size > self.file_manager.max_size:
+                return Protocol.create_message(Protocol.ERROR, "SERVER", f"El archivo supera el maximo de {self.file_manager.max_size} bytes")
+
+            try:
+                file_id, offset = self.file_manager.create_offer(sender, target, name, size, info.get('file_id'))
+            except SpoolError as e:
+                return Protocol.create_message(Protocol.ERROR, "SERVER", str(e))
+            # Un archivo vacio ya esta completo al ofrecerlo; si es una subida que se continua ya se aviso antes
+            if offset == size and file_id != info.get('file_id'):
+                self.notify_file(file_id)
+            return Protocol.create_message(Protocol.FILE_OFFER, "SERVER", {"file_id": file_id, "offset": offset})
+
+        elif msg_type == Protocol.FILE_CHUNK:
+            file_id = info.get('file_id')
+            offset = self.file_manager.write_chunk(file_id, sender, info.get('offset'), info.get('length'), transport)
+            if offset is None:
+                self.abort_file_chunk(transport, "Fragmento de archivo invalido")
+            if self.file_manager.is_complete(file_id):
+                file_info = self.file_manager.get_file(file_id)
+                print(f"{Colors.GREEN}{sender} subio {file_info['name']} ({file_info['size']} bytes, id {file_id}){Colors.RESET}")
+                self.notify_file(file_id)
+                return Protocol.create_message(Protocol.ACK, "SERVER", f"Archivo {file_info['name']} enviado (id {file_id})")
+            return None
+
+        elif msg_type == Protocol.FILE_GET:
+            file_id = info.get('file_id')
+            # Mientras se descarga, el archivo no se puede borrar por viejo
+            file_info = self.file_manager.start_download(file_id)
+            if not file_info:
+                return Protocol.create_message(Protocol.ERROR, "SERVER", f"Archivo {file_id} no encontrado")
+            try:
+                if file_info['target'] and sender not in [file_info['target'], file_info['sender']]:
+                    return Protocol.create_message(Protocol.ERROR, "SERVER", f"Archivo {file_id} no encontrado")
+
+                size = file_info['size']
+                offset = info.get('offset')
+                if type(offset) is not int or offset < 0 or offset > size:
+                    offset = 0
+                header = {
+                    "file_id": file_id,
+                    "name": file_info['name'],
+                    "size": size,
+                    "offset": offset,
+                    "length": size - offset
+                }
+                transport.send(Protocol.create_message(Protocol.FILE_CHUNK, "SERVER", header))
+                # Los bytes salen directo del disco al socket, sin pasar por JSON
+                with open(self.file_manager.get_path(file_id), 'rb') as f:
+                    transport.send_file(f, offset, size - offset)
+                return None
+            finally:
+                self.file_manager.end_download(file_id)
+
+        return None
+
+    # Procesa un comando de administracion (pilas, tiempo de CPU y perfilado)
+    # Solo se aceptan por TCP, desde la misma computadora y con la clave correcta
+    # Parametros:
+    #   msg: El diccionario del mensaje
+    #   addr: La direccion del remitente
+    #   transport: El medio para responder
+    # Retorna:
+    #   La respuesta con el resultado del comando o un error
+    def process_admin(self, msg, addr, transport):
+        info = msg.get('payload')
+        if not isinstance(info, dict):
+            info = {}
+        token = str(info.get('token', ''))
+        if (not self.admin_token or not isinstance(transport, TCPTransport)
+                or addr[0] not in ['127.0.0.1', '::1']
+                or not hmac.compare_digest(token.encode('utf-8'), self.admin_token.encode('utf-8'))):
+            print(f"{Colors.RED}Comando de administracion rechazado desde {addr[0]}:{addr[1]}{Colors.RESET}")
+            return Protocol.create_message(Protocol.ERROR, "SERVER", "No autorizado")
+
+        command = info.get('command')
+        print(f"{Colors.GRAY}Comando de administracion: {command}{Colors.RESET}")
+
+        if command == 'stacks':
+            result = Profiler.dump_stacks()
+
+        elif command == 'cpu':
+            result = Profiler.thread_cpu_times()
+            if result is None:
+                return Protocol.create_message(Protocol.ERROR, "SERVER", "El sistema no soporta tiempo de CPU por hilo")
+
+        elif command == 'start':
+            if not self.profiler.start():
+                return Protocol.create_message(Protocol.ERROR, "SERVER", "El perfilador ya esta corriendo")
+            result = "Perfilador iniciado"
+
+        elif command == 'stop':
+            result = self.profiler.stop()
+            if result is None:
+                return Protocol.create_message(Protocol.ERROR, "SERVER", "El perfilador no esta corriendo")
+
+        elif command == 'profile':
+            seconds = info.get('seconds')
+            if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or not 1 <= seconds <= 300:
+                return Protocol.create_message(Protocol.ERROR, "SERVER", "Los segundos deben estar entre 1 y 300")
+            if not self.profiler.start():
+                return Protocol.create_message(Protocol.ERROR, "SERVER", "El perfilador ya esta corriendo")
+            time.sleep(seconds)
+            result = self.profiler.stop()
+            if result is None:
+                return Protocol.create_message(Protocol.ERROR, "SERVER", "El perfilador se detuvo desde otra conexion")
+
+        else:
+            return Protocol.create_message(Protocol.ERROR, "SERVER", f"Comando desconocido: {command}")
+
+        return Protocol.create_message(Protocol.ADMIN, "SERVER", result)
+
+    # Rechaza un fragmento de archivo y corta la conexion
+    # Los bytes del fragmento ya vienen detras del encabezado, asi que no se puede seguir leyendo
+    # Parametros:
+    #   transport: La conexion TCP de la transferencia
+    #   text: El motivo del rechazo
+    def abort_file_chunk(self, transport, text):
+        transport.send(Protocol.create_message(Protocol.ERROR, "SERVER", text))
+        raise ConnectionAbortedError(text)
+
+    # Avisa al destinatario (o a todos) que hay un archivo listo para descargar
+    # Parametros:
+    #   file_id: El id del archivo ya subido
+    def notify_file(self, file_id):
+        file_info = self.file_manager.get_file(file_id)
+        payload = {"file_id": file_id, "name": file_info['name'], "size": file_info['size']}
+        data = Protocol.create_message(Protocol.FILE_OFFER, file_info['sender'], payload, target=file_info['target'])
+        if file_info['target']:
+            self._send_to_user(file_info['target'], data)
+        else:
+            for user in self.client_manager.get_all_clients():
+                if user != file_info['sender']:
+                    self._send_to_user(user, data)
+
     # Envia un mensaje a TODOS los usuarios conectados
     # Parametros:
     #   msg_dict: El contenido del mensaje
@@ -277,6 +467,12 @@ if __name__ == "__main__":
     parser.add_argument('--protocol', choices=['tcp', 'udp', 'both'], default='both', help='Protocolo a usar')
     parser.add_argument('--port', type=int, default=None, help='Puerto de escucha')
     parser.add_argument('--host', default='0.0.0.0', help='Direccion de escucha')
+    parser.add_argument('--spool', default='spool', help='Carpeta donde se guardan los archivos compartidos')
+    parser.add_argument('--max-file-size', type=int, default=100, help='Tamaño maximo de cada archivo en MB')
+    parser.add_argument('--max-spool-size', type=int, default=1024, help='Espacio maximo de todos los archivos juntos en MB')
+    parser.add_argument('--max-user-spool', type=int, default=300, help='Espacio maximo de los archivos de cada usuario en MB')
+    parser.add_argument('--admin-token-file', default=None,
+                        help=f'Archivo (permisos 600) con la clave de administracion; si no se indica se usa la variable {ADMIN_TOKEN_ENV}. Sin clave los comandos estan desactivados')
     args = parser.parse_args()
 
     # Solicitar puerto si no se proporcionó
@@ -297,7 +493,11 @@ if __name__ == "__main__":
                 sys.exit(0)
 
     try:
-        server = ChatServer(host=args.host, port=port, protocol_type=args.protocol)
+        admin_token = load_admin_token(args.admin_token_file)
+        server = ChatServer(host=args.host, port=port, protocol_type=args.protocol, spool_dir=args.spool,
+                            max_file_size=args.max_file_size * 1024 * 1024,
+                            max_spool_size=args.max_spool_size * 1024 * 1024,
+                            max_user_spool=args.max_user_spool * 1024 * 1024, admin_token=admin_token)
         server.start()
     except KeyboardInterrupt:
         print("\nServidor detenido")
@@ -1,3 +1,4 @@
+import secrets
 import threading
 
 class ClientManager:
@@ -6,6 +7,8 @@ class ClientManager:
     #   max_clients: Cuantos clientes permitimos como maximo (por defecto 5)
     def __init__(self, max_clients=5):
         self.clients = {} 
+        # Claves de sesion (token -> usuario) para las conexiones de archivos
+        self.sessions = {}
         self.max_clients = max_clients
         self.lock = threading.Lock()
 
@@ -33,6 +36,32 @@ class ClientManager:
         with self.lock:
             if username in self.clients:
                 del self.clients[username]
+            for token, user in list(self.sessions.items()):
+                if user == username:
+                    del self.sessions[token]
+
+    # Crea una clave de sesion para un usuario que ya inicio sesion
+    # La clave se entrega solo por la conexion del chat y sirve para identificarse en las transferencias
+    # Parametros:
+    #   username: El nombre del usuario
+    # Retorna:
+    #   La clave de sesion
+    def create_session(self, username):
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.sessions[token] = username
+        return token
+
+    # Busca el usuario dueño de una clave de sesion
+    # Parametros:
+    #   token: La clave de sesion
+    # Retorna:
+    #   El nombre del usuario, o None si la clave no es valida
+    def get_session_user(self, token):
+        if not isinstance(token, str):
+            return None
+        with self.lock:
+            return self.sessions.get(token)
 
     # Busca la informacion de un cliente
     # Parametros:
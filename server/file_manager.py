@@ -0,0 +1,198 @@
+import os
+import re
+import time
+import uuid
+import threading
+
+# Error cuando no se puede aceptar una oferta de archivo, el mensaje se le muestra al usuario
+class SpoolError(Exception):
+    pass
+
+class FileManager:
+    # Segundos sin recibir fragmentos antes de borrar una subida abandonada
+    STALE_UPLOAD_SECONDS = 60 * 60
+    # Segundos que se guarda un archivo completo para que lo puedan descargar
+    FILE_LIFETIME_SECONDS = 24 * 60 * 60
+
+    # Constructor: Prepara el gestor de archivos compartidos
+    # Parametros:
+    #   spool_dir: La carpeta donde se guardan los archivos subidos
+    #   max_size: El tamaño maximo permitido por archivo en bytes
+    #   max_total: El espacio maximo que pueden ocupar todos los archivos juntos en bytes
+    #   max_per_sender: El espacio maximo que puede ocupar cada usuario en bytes
+    def __init__(self, spool_dir='spool', max_size=100 * 1024 * 1024,
+                 max_total=1024 * 1024 * 1024, max_per_sender=300 * 1024 * 1024):
+        self.spool_dir = spool_dir
+        self.max_size = max_size
+        self.max_total = max_total
+        self.max_per_sender = max_per_sender
+        self.files = {}
+        self.lock = threading.Lock()
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._remove_orphans()
+
+    # Borra los archivos que quedaron en el spool de una ejecucion anterior
+    # El indice de archivos vive en memoria, asi que despues de reiniciar ya nadie los puede descargar
+    def _remove_orphans(self):
+        for entry in os.listdir(self.spool_dir):
+            # Solo se borran los archivos con nombre de id, por si la carpeta tiene otras cosas
+            if re.fullmatch(r'[0-9a-f]{8}', entry):
+                try:
+                    os.remove(self.get_path(entry))
+                except OSError:
+                    pass
+
+    # Borra las subidas abandonadas y los archivos viejos
+    # Se tiene que llamar con el lock tomado
+    def _remove_expired(self):
+        now = time.time()
+        for file_id, info in list(self.files.items()):
+            # No se borra un archivo que se esta subiendo o descargando
+            if info['busy'] or info['readers']:
+                continue
+            complete = info['offset'] == info['size']
+            max_age = self.FILE_LIFETIME_SECONDS if complete else self.STALE_UPLOAD_SECONDS
+            if now - info['updated'] > max_age:
+                del self.files[file_id]
+                try:
+                    os.remove(self.get_path(file_id))
+                except OSError:
+                    pass
+
+    # Registra un archivo nuevo que un usuario quiere compartir
+    # Si ya existe una oferta igual del mismo usuario, la reutiliza para continuar la subida
+    # Parametros:
+    #   sender: Quien sube el archivo
+    #   target: A quien va dirigido (None significa a todos)
+    #   name: El nombre del archivo
+    #   size: El tamaño total en bytes
+    #   file_id: Id de una subida anterior que se quiere continuar (opcional)
+    # Retorna:
+    #   Una tupla (file_id, offset) con el id y desde donde hay que seguir enviando
+    # Lanza:
+    #   SpoolError si esa subida ya se esta enviando o no queda espacio en el spool
+    def create_offer(self, sender, target, name, size, file_id=None):
+        with self.lock:
+            self._remove_expired()
+            info = self.files.get(file_id)
+            if info and info['sender'] == sender and info['name'] == name and info['size'] == size:
+                if info['busy']:
+                    raise SpoolError("Ese archivo ya se esta enviando")
+                info['updated'] = time.time()
+                return file_id, info['offset']
+
+            # El tamaño completo se reserva desde la oferta, aunque todavia no haya llegado
+            total = sum(f['size'] for f in self.files.values())
+            if total + size > self.max_total:
+                raise SpoolError("El servidor no tiene espacio para mas archivos")
+            used = sum(f['size'] for f in self.files.values() if f['sender'] == sender)
+            if used + size > self.max_per_sender:
+                raise SpoolError("Ya tienes demasiados archivos en el servidor, espera a que se borren")
+
+            file_id = uuid.uuid4().hex[:8]
+            while file_id in self.files:
+                file_id = uuid.uuid4().hex[:8]
+            self.files[file_id] = {
+                "sender": sender,
+                "target": target,
+                "name": name,
+                "size": size,
+                "offset": 0,
+                "busy": False,
+                "readers": 0,
+                "updated": time.time()
+            }
+            # El archivo se guarda con el id para no confiar en el nombre que manda el cliente
+            open(self.get_path(file_id), 'wb').close()
+            return file_id, 0
+
+    # Guarda un fragmento que llega por la conexion directamente al archivo del spool
+    # Mientras se escribe, el archivo queda ocupado y se rechaza a cualquier otra conexion
+    # Parametros:
+    #   file_id: El id del archivo
+    #   sender: Quien envia el fragmento
+    #   offset: La posicion del fragmento dentro del archivo
+    #   length: Cuantos bytes trae el fragmento
+    #   transport: La conexion TCP de donde se leen los bytes
+    # Retorna:
+    #   El nuevo offset del archivo, o None si el fragmento no es valido o no llego completo
+    def write_chunk(self, file_id, sender, offset, length, transport):
+        if type(offset) is not int or type(length) is not int:
+            return None
+        with self.lock:
+            info = self.files.get(file_id)
+            if not info or info['sender'] != sender or info['busy']:
+                return None
+            if offset != info['offset'] or length <= 0 or offset + length > info['size']:
+                return None
+            info['busy'] = True
+
+        received = 0
+        complete = False
+        try:
+            with open(self.get_path(file_id), 'r+b') as f:
+                f.seek(offset)
+                try:
+                    complete = transport.recv_to_file(f, length)
+                finally:
+                    received = f.tell() - offset
+                    f.truncate()
+        finally:
+            with self.lock:
+                # Se guarda lo que si llego para poder continuar despues desde ahi
+                info['offset'] = offset + received
+                info['busy'] = False
+                info['updated'] = time.time()
+
+        return info['offset'] if complete else None
+
+    # Busca la informacion de un archivo
+    # Parametros:
+    #   file_id: El id del archivo
+    # Retorna:
+    #   Una copia del diccionario con los datos del archivo, o None si no existe
+    def get_file(self, file_id):
+        with self.lock:
+            info = self.files.get(file_id)
+            return dict(info) if info else None
+
+    # Verifica si un archivo ya se subio completo
+    # Parametros:
+    #   file_id: El id del archivo
+    # Retorna:
+    #   True si esta completo, False si no
+    def is_complete(self, file_id):
+        with self.lock:
+            info = self.files.get(file_id)
+            return bool(info) and info['offset'] == info['size']
+
+    # Marca que un archivo completo se empieza a descargar, para que no se borre mientras tanto
+    # Parametros:
+    #   file_id: El id del archivo
+    # Retorna:
+    #   Una copia del diccionario con los datos del archivo, o None si no existe o no esta completo
+    def start_download(self, file_id):
+        with self.lock:
+            info = self.files.get(file_id)
+            if not info or info['offset'] != info['size']:
+                return None
+            info['readers'] += 1
+            return dict(info)
+
+    # Marca que termino una descarga empezada con start_download
+    # Parametros:
+    #   file_id: El id del archivo
+    def end_download(self, file_id):
+        with self.lock:
+            info = self.files.get(file_id)
+            if info:
+                info['readers'] -= 1
+                info['updated'] = time.time()
+
+    # Obtiene la ruta en disco de un archivo
+    # Parametros:
+    #   file_id: El id del archivo
+    # Retorna:
+    #   La ruta dentro del spool
+    def get_path(self, file_id):
+        return os.path.join(self.spool_dir, file_id)
@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+import threading
+import traceback
+
+class Profiler:
+    # Constructor: Prepara el perfilador por muestreo
+    # No arranca ningun hilo hasta que se llama a start, asi no cuesta nada mientras no se usa
+    # Parametros:
+    #   interval: Cada cuantos segundos se toma una muestra de las pilas (por defecto 5 ms)
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.lock = threading.Lock()
+        # Datos de la corrida actual: (hilo, evento para detenerlo, muestras), o None si no esta corriendo
+        self.run = None
+
+    # Empieza a tomar muestras en un hilo aparte
+    # Retorna:
+    #   True si arranco, False si ya estaba corriendo
+    def start(self):
+        with self.lock:
+            if self.run:
+                return False
+            # Cada corrida tiene su propio evento y sus propias muestras,
+            # asi un hilo de muestreo viejo nunca escribe en la corrida nueva
+            stop_event = threading.Event()
+            samples = {}
+            thread = threading.Thread(target=self._sample_loop, args=(stop_event, samples),
+                                      name="profiler", daemon=True)
+            self.run = (thread, stop_event, samples)
+            thread.start()
+            return True
+
+    # Detiene el muestreo
+    # Retorna:
+    #   Las pilas en formato "collapsed" (una linea "hilo;func;func N" por pila), listo para un flame graph,
+    #   o None si no estaba corriendo
+    def stop(self):
+        with self.lock:
+            run = self.run
+            self.run = None
+        if not run:
+            return None
+        thread, stop_event, samples = run
+        stop_event.set()
+        thread.join()
+        lines = [f"{stack} {count}" for stack, count in sorted(samples.items())]
+        return "\n".join(lines) + "\n" if lines else ""
+
+    # Indica si el perfilador esta tomando muestras
+    # Retorna:
+    #   True si esta corriendo, False si no
+    def is_running(self):
+        with self.lock:
+            return self.run is not None
+
+    # Bucle del hilo de muestreo: lee la pila de cada hilo y cuenta cuantas veces aparece
+    # Parametros:
+    #   stop_event: El evento que detiene esta corrida
+    #   samples: El diccionario donde se cuentan las pilas de esta corrida
+    def _sample_loop(self, stop_event, samples):
+        own_id = threading.get_ident()
+        while not stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = [names.get(thread_id, str(thread_id))]
+                stack.extend(f"{os.path.basename(f.f_code.co_filename)}:{f.f_code.co_name}"
+                             for f, _ in traceback.walk_stack(frame))
+                # walk_stack va de la funcion actual hacia afuera, el formato collapsed va al reves
+                key = ";".join([stack[0]] + stack[:0:-1])
+                samples[key] = samples.get(key, 0) + 1
+
+    # Obtiene la pila actual de todos los hilos
+    # Retorna:
+    #   Un texto con el nombre de cada hilo y su pila, como un "thread dump"
+    @staticmethod
+    def dump_stacks():
+        names = {t.ident: t.name for t in threading.enumerate()}
+        parts = []
+        for thread_id, frame in sys._current_frames().items():
+            name = names.get(thread_id, "desconocido")
+            parts.append(f"Hilo {name} ({thread_id}):\n" + "".join(traceback.format_stack(frame)))
+        return "\n".join(parts)
+
+    # Obtiene el tiempo de CPU que ha usado cada hilo
+    # Solo funciona en sistemas con pthread_getcpuclockid (Linux y otros Unix, no Mac ni Windows)
+    # Retorna:
+    #   Un diccionario {"nombre_hilo (id)": segundos_cpu}, o None si el sistema no lo soporta
+    @staticmethod
+    def thread_cpu_times():
+        if not hasattr(time, 'pthread_getcpuclockid'):
+            return None
+        times = {}
+        for t in threading.enumerate():
+            try:
+                clock_id = time.pthread_getcpuclockid(t.ident)
+                # Los nombres de hilo se pueden repetir, por eso se agrega el id
+                times[f"{t.name} ({t.ident})"] = round(time.clock_gettime(clock_id), 4)
+            except (OSError, TypeError):
+                # El hilo termino mientras lo recorriamos
+                continue
+        return times